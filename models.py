@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Modelos y constantes compartidos del Guruwalk Agent API
+"""
+
+from pydantic import BaseModel
+
+# Tarea por defecto (constante de módulo, no se copia por request)
+DEFAULT_TASK = """
+    1. Ve a https://www.guruwalk.com/es
+    2. Haz clic en 'Iniciar sesión' o 'Login'.
+    3. Haz clic en el botón que dice 'Seguir con contraseña' o similar.
+    4. Cuando aparezcan los campos, ingresa el email: heredialucasfac22@gmail.com
+    5. Ingresa la contraseña exacta: Lucas37312237. (incluye el punto al final)
+    6. Haz clic en 'Iniciar sesión' para completar el login.
+    7. Una vez dentro, navega a la sección 'Reservas'.
+    8. Confirma que puedes ver el contenido de Reservas.
+    9. Termina el flujo mostrando que fue exitoso.
+    """
+
+class TaskRequest(BaseModel):
+    # El viejo campo `task: str = "default"` nunca se leía; los clientes que aún
+    # lo mandan no rompen porque pydantic ignora campos extra por defecto
+    custom_task: str | None = None
+
+class TaskResponse(BaseModel):
+    task_id: str
+    status: str
+    message: str
+
+class TaskStatus(BaseModel):
+    task_id: str
+    status: str
+    result: dict | None = None
+    error: str | None = None
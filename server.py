@@ -4,37 +4,57 @@ Servidor FastAPI para Guruwalk Agent - Optimizado para Render
 """
 
 import asyncio
+import logging
 import os
 import sys
 import uuid
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+import orjson
 import uvicorn
 
+from models import DEFAULT_TASK, TaskRequest, TaskResponse, TaskStatus
+from task_store import TERMINAL_STATUSES, make_task_store
+
 load_dotenv()
 
-# Modelos
-class TaskRequest(BaseModel):
-    task: str = "default"
-    custom_task: Optional[str] = None
+# Logging estructurado con formateo lazy (%s) en vez de print + f-strings
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    format="%(asctime)s %(levelname)s %(message)s",
+    stream=sys.stderr,
+)
+logger = logging.getLogger("guruwalk")
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    # Startup: executor chico y acotado para el trabajo sync, imports pesados
+    # en un thread para no bloquear el loop, y pool de browsers pre-calentado
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=4, thread_name_prefix="guruwalk"))
+    await asyncio.to_thread(_import_heavy)
+    await pool.fill()
 
-class TaskResponse(BaseModel):
-    task_id: str
-    status: str
-    message: str
+    yield
 
-class TaskStatus(BaseModel):
-    task_id: str
-    status: str
-    result: Optional[dict] = None
-    error: Optional[str] = None
+    # Shutdown: ready=False primero para que los release en vuelo no relancen
+    # Chromium, después cancelar los runners y esperar que devuelvan sus
+    # browsers antes de cerrar el pool: sin huérfanos ni SIGKILL a los 30s
+    pool.ready = False
+    for task in list(_background_tasks):
+        task.cancel()
+    if _background_tasks:
+        await asyncio.gather(*_background_tasks, return_exceptions=True)
+    await pool.shutdown()
 
 # App
-app = FastAPI(title="Guruwalk Agent API", version="1.0.0")
+app = FastAPI(title="Guruwalk Agent API", version="1.0.0", default_response_class=ORJSONResponse, lifespan=_lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -44,55 +64,171 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Storage
-tasks = {}
-browser_session = None
+class SelectiveGZipMiddleware:
+    """GZip excepto para los streams SSE: el buffer de zlib (Z_NO_FLUSH) retendría
+    los eventos `data:` chicos y el cliente los vería tarde o recién al cerrar"""
+
+    def __init__(self, app, minimum_size: int = 512, compresslevel: int = 5):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=compresslevel)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith("/tasks/") and scope["path"].endswith("/stream"):
+            await self.app(scope, receive, send)
+            return
+        await self.gzip(scope, receive, send)
+
+app.add_middleware(SelectiveGZipMiddleware, minimum_size=512, compresslevel=5)
+
+# Símbolos pesados resueltos una sola vez en startup (ver _import_heavy)
+Agent = None
+ChatOpenAI = None
+BrowserSession = None
+BrowserProfile = None
+
+def _import_heavy():
+    """Importar browser_use una sola vez y cachear los símbolos como globals"""
+    global Agent, ChatOpenAI, BrowserSession, BrowserProfile
+    from browser_use import Agent as _Agent
+    from browser_use.browser import BrowserSession as _BrowserSession, BrowserProfile as _BrowserProfile
+    from browser_use.llm.openai.chat import ChatOpenAI as _ChatOpenAI
+    Agent = _Agent
+    ChatOpenAI = _ChatOpenAI
+    BrowserSession = _BrowserSession
+    BrowserProfile = _BrowserProfile
+
+# Storage: en memoria por defecto, compartido vía Redis si REDIS_URL está seteado
+store = make_task_store()
 llm_model = None
+_llm_lock = asyncio.Lock()
 
-# Lazy loading functions
-async def get_browser():
-    global browser_session
-    if browser_session is None:
-        from browser_use.browser import BrowserSession, BrowserProfile
-        
-        print("🔄 Starting browser...")
-        profile = BrowserProfile(
-            headless=True,
-            user_data_dir=None,
-            disable_security=False,
-            args=[
-                '--no-sandbox',
-                '--disable-dev-shm-usage',
-                '--disable-gpu',
-                '--disable-background-timer-throttling',
-                '--disable-renderer-backgrounding',
-                '--disable-backgrounding-occluded-windows',
-                '--disable-extensions',
-                '--disable-plugins',
-                '--no-first-run',
-                '--disable-default-apps',
-            ]
-        )
-        
-        try:
-            browser_session = BrowserSession(browser_profile=profile)
-            await asyncio.wait_for(browser_session.start(), timeout=60)
-            print("✅ Browser started")
-        except asyncio.TimeoutError:
-            print("❌ Browser startup timeout")
-            raise HTTPException(status_code=503, detail="Browser startup timeout")
-        except Exception as e:
-            print(f"❌ Browser failed to start: {e}")
-            raise HTTPException(status_code=503, detail=f"Browser unavailable: {str(e)}")
-    
-    return browser_session
+# Runners en vuelo, trackeados para poder cancelarlos ordenadamente en shutdown
+# (el equivalente a un TaskGroup de vida larga, que no encaja en hooks de FastAPI)
+_background_tasks: set = set()
+
+def _spawn_task(coro):
+    task = asyncio.get_running_loop().create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+# Pool de browsers pre-calentados para no pagar el cold-start de Chromium por tarea
+POOL_SIZE = int(os.getenv("BROWSER_POOL", 2))
+MAX_SESSION_USES = int(os.getenv("BROWSER_MAX_USES", 25))
+
+# Args de Chromium congelados como constante de módulo (inmutables, compartibles)
+_CHROMIUM_ARGS = (
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--disable-background-timer-throttling',
+    '--disable-renderer-backgrounding',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-extensions',
+    '--disable-plugins',
+    '--no-first-run',
+    '--disable-default-apps',
+)
+
+class BrowserPool:
+    """Pool de BrowserSession pre-iniciadas, reciclado tras N usos o error"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.ready = False
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._uses: dict[int, int] = {}
+        self._profile = None
+        # Sesiones que no pudieron relanzarse al reciclar; se reponen lazy en acquire
+        self._deficit = 0
+
+    def _new_session(self):
+        if BrowserSession is None:
+            _import_heavy()
+        assert BrowserSession is not None and BrowserProfile is not None
+
+        # Perfil construido (y validado) una sola vez; BrowserSession hace
+        # model_copy del profile en su init, así que compartirlo es seguro
+        if self._profile is None:
+            self._profile = BrowserProfile(
+                headless=True,
+                user_data_dir=None,
+                disable_security=False,
+                args=list(_CHROMIUM_ARGS),
+            )
+        return BrowserSession(browser_profile=self._profile)
+
+    async def _start_session(self):
+        session = self._new_session()
+        await asyncio.wait_for(session.start(), timeout=60)
+        self._uses[id(session)] = 0
+        return session
+
+    async def fill(self):
+        sessions = await asyncio.gather(*[self._start_session() for _ in range(self.size)])
+        for session in sessions:
+            self._queue.put_nowait(session)
+        self.ready = True
+        logger.info("✅ Browser pool ready (%s sessions)", self.size)
+
+    async def acquire(self):
+        # Reponer una sesión pendiente de reciclado fallido antes de esperar
+        if self._deficit > 0 and self._queue.empty():
+            self._deficit -= 1
+            try:
+                self._queue.put_nowait(await self._start_session())
+            except Exception as e:
+                self._deficit += 1
+                logger.warning("⚠️ Error replenishing browser pool: %s", e)
+        return await self._queue.get()
+
+    async def release(self, session, broken: bool = False):
+        if not self.ready:
+            # Shutdown en curso: no relanzar Chromium, pool.shutdown() la cierra
+            self._queue.put_nowait(session)
+            return
+        self._uses[id(session)] = self._uses.get(id(session), 0) + 1
+        if broken or self._uses[id(session)] >= MAX_SESSION_USES:
+            # Reciclar: cerrar la sesión gastada y arrancar una fresca
+            self._uses.pop(id(session), None)
+            try:
+                await asyncio.wait_for(session.close(), timeout=30)
+            except Exception as e:
+                logger.warning("⚠️ Error closing recycled browser: %s", e)
+            try:
+                session = await self._start_session()
+            except Exception as e:
+                # No achicar el pool ni enmascarar la excepción original de la
+                # tarea: anotar el déficit y reponer en el próximo acquire
+                self._deficit += 1
+                logger.warning("⚠️ Error restarting recycled browser: %s", e)
+                return
+        self._queue.put_nowait(session)
+
+    async def shutdown(self):
+        self.ready = False
+        while not self._queue.empty():
+            session = self._queue.get_nowait()
+            try:
+                await asyncio.wait_for(session.close(), timeout=30)
+            except Exception as e:
+                logger.warning("⚠️ Error closing pooled browser: %s", e)
+
+pool = BrowserPool(POOL_SIZE)
+
+# Control de admisión: las tareas quedan en "pending" hasta que haya un permiso libre
+_task_sem = asyncio.Semaphore(int(os.getenv("MAX_CONCURRENT_TASKS", POOL_SIZE)))
 
 async def get_llm():
     global llm_model
     if llm_model is None:
-        from browser_use.llm.openai.chat import ChatOpenAI
-        llm_model = ChatOpenAI(model='gpt-4o-mini')
-        print("✅ LLM initialized")
+        async with _llm_lock:
+            if llm_model is None:
+                if ChatOpenAI is None:
+                    _import_heavy()
+                assert ChatOpenAI is not None
+                llm_model = ChatOpenAI(model='gpt-4o-mini')
+                logger.info("✅ LLM initialized")
     
     return llm_model
 
@@ -105,102 +241,161 @@ async def root():
 async def ping():
     return {"ping": "pong"}
 
-@app.get("/health")
-async def health():
+async def _health_payload() -> dict:
+    """Único lugar donde se arma el body de /health (ruta FastAPI y fast-path ASGI)"""
     return {
         "status": "healthy",
-        "browser": "ready" if browser_session else "not_started",
-        "active_tasks": len([t for t in tasks.values() if t["status"] == "running"]),
+        "browser": "ready" if pool.ready else "not_started",
+        "active_tasks": await store.running_count(),
         "server": "online"
     }
 
+@app.get("/health")
+async def health():
+    return await _health_payload()
+
 @app.post("/tasks", response_model=TaskResponse)
-async def create_task(request: TaskRequest, background_tasks: BackgroundTasks):
-    task_id = str(uuid.uuid4())
-    
-    # Default task
-    default_task = """
-    1. Ve a https://www.guruwalk.com/es
-    2. Haz clic en 'Iniciar sesión' o 'Login'.
-    3. Haz clic en el botón que dice 'Seguir con contraseña' o similar.
-    4. Cuando aparezcan los campos, ingresa el email: heredialucasfac22@gmail.com
-    5. Ingresa la contraseña exacta: Lucas37312237. (incluye el punto al final)
-    6. Haz clic en 'Iniciar sesión' para completar el login.
-    7. Una vez dentro, navega a la sección 'Reservas'.
-    8. Confirma que puedes ver el contenido de Reservas.
-    9. Termina el flujo mostrando que fue exitoso.
-    """
-    
-    final_task = request.custom_task if request.custom_task else default_task
+async def create_task(request: TaskRequest):
+    task_id = uuid.uuid4().hex
+
+    final_task = request.custom_task or DEFAULT_TASK
     
-    tasks[task_id] = {
+    await store.create(task_id, {
         "status": "pending",
         "result": None,
         "error": None
-    }
-    
-    background_tasks.add_task(run_task, task_id, final_task)
+    })
     
-    return TaskResponse(
-        task_id=task_id,
-        status="started",
-        message="Task created successfully"
-    )
+    _spawn_task(run_task(task_id, final_task))
+
+    # Dict crudo: response_model valida una sola vez al serializar
+    return {
+        "task_id": task_id,
+        "status": "started",
+        "message": "Task created successfully"
+    }
 
 @app.get("/tasks/{task_id}", response_model=TaskStatus)
 async def get_task(task_id: str):
-    if task_id not in tasks:
+    task = await store.get(task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
-    
-    task = tasks[task_id]
-    return TaskStatus(
-        task_id=task_id,
-        status=task["status"],
-        result=task["result"],
-        error=task["error"]
-    )
+
+    # Dict crudo: response_model valida una sola vez al serializar
+    return {"task_id": task_id, **task}
+
+@app.get("/tasks/{task_id}/stream")
+async def stream_task(task_id: str):
+    if await store.get(task_id) is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return StreamingResponse(_task_event_stream(task_id), media_type="text/event-stream")
+
+async def _task_event_stream(task_id: str):
+    """Emitir un evento SSE por transición de estado, en vez de que el cliente haga polling"""
+    async for task in store.watch(task_id):
+        state = {"task_id": task_id, **task}
+        yield f"data: {orjson.dumps(state).decode()}\n\n"
 
 @app.get("/tasks")
-async def list_tasks():
-    return {"tasks": list(tasks.keys()), "count": len(tasks)}
+async def list_tasks(limit: int = Query(100, ge=1, le=1000), offset: int = Query(0, ge=0)):
+    task_ids, count = await store.list_ids(limit, offset)
+    return {"tasks": task_ids, "count": count}
 
 # Background task runner
 async def run_task(task_id: str, task_text: str):
     try:
-        print(f"🚀 Starting task {task_id}")
-        tasks[task_id]["status"] = "running"
-        
-        # Get browser and LLM
-        browser = await get_browser()
+        async with _task_sem:
+            await _run_task_inner(task_id, task_text)
+    except asyncio.CancelledError:
+        # Cancelada mientras esperaba el semáforo o el pool: que no quede
+        # "pending"/"running" para siempre en el store
+        task = await store.get(task_id)
+        if task is not None and task["status"] not in TERMINAL_STATUSES:
+            await store.set_status(task_id, "failed", error="cancelled during shutdown")
+        raise
+
+async def _run_task_inner(task_id: str, task_text: str):
+    logger.info("🚀 Starting task %s", task_id)
+
+    # Tomar un browser ya iniciado del pool
+    browser = await pool.acquire()
+    broken = False
+    try:
+        # "running" recién acá, dentro del try: una cancelación en acquire()
+        # no puede dejar el contador ni el estado colgados
+        await store.set_status(task_id, "running")
+
         llm = await get_llm()
-        
-        # Import and create agent
-        from browser_use import Agent
+
+        # Crear agente (Agent ya está cacheado como global desde startup)
+        if Agent is None:
+            _import_heavy()
+        assert Agent is not None
         agent = Agent(task=task_text, llm=llm, browser_session=browser)
-        
+
         # Run agent
         result = await agent.run()
-        
+
         # Save result
-        tasks[task_id]["status"] = "completed"
-        tasks[task_id]["result"] = {
+        await store.set_status(task_id, "completed", result={
             "success": True,
             "usage": result.usage.model_dump() if result and result.usage else None
-        }
-        
-        print(f"✅ Task {task_id} completed")
-        
+        })
+
+        logger.info("✅ Task %s completed", task_id)
+
+    except asyncio.CancelledError:
+        logger.warning("🛑 Task %s cancelled during shutdown", task_id)
+        broken = True
+        await store.set_status(task_id, "failed", error="cancelled during shutdown")
+        raise
     except Exception as e:
-        print(f"❌ Task {task_id} failed: {e}")
-        tasks[task_id]["status"] = "failed"
-        tasks[task_id]["error"] = str(e)
+        logger.exception("❌ Task %s failed: %s", task_id, e)
+        broken = True
+        await store.set_status(task_id, "failed", error=str(e))
+    finally:
+        await pool.release(browser, broken=broken)
+
+# Fast-path ASGI: /ping y /health responden antes de entrar al router de FastAPI
+# (sin dependency injection, ni response_model, ni middleware)
+_PING_BODY = b'{"ping":"pong"}'
+
+async def _send_json(send, body: bytes):
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+async def asgi_app(scope, receive, send):
+    if scope["type"] == "http" and scope["method"] == "GET":
+        if scope["path"] == "/ping":
+            await _send_json(send, _PING_BODY)
+            return
+        if scope["path"] == "/health":
+            await _send_json(send, orjson.dumps(await _health_payload()))
+            return
+    await app(scope, receive, send)
 
 # Run server
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
+    # workers > 1 requiere REDIS_URL para que el estado de tasks sea compartido;
+    # con el MemoryTaskStore por-proceso los GET /tasks/{id} darían 404 según el worker
+    workers = int(os.getenv("WEB_CONCURRENCY", 1))
+    assert workers == 1 or os.getenv("REDIS_URL"), (
+        "WEB_CONCURRENCY > 1 requires REDIS_URL: the in-memory task store is per-process"
+    )
     uvicorn.run(
-        app, 
-        host="0.0.0.0", 
+        "server:asgi_app",
+        host="0.0.0.0",
         port=port,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
         timeout_keep_alive=75
-    ) 
\ No newline at end of file
+    )
\ No newline at end of file
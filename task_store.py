@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Store de estado de tasks: en memoria por defecto, Redis si REDIS_URL está seteado
+
+Con Redis el estado es compartido entre workers de uvicorn, así que
+GET /tasks/{id} funciona sin importar qué worker ejecutó la tarea.
+"""
+
+import asyncio
+import os
+
+import orjson
+
+MAX_TASKS = int(os.getenv("MAX_TASKS", 1024))
+TERMINAL_STATUSES = ("completed", "failed")
+
+# TTL de las entradas en Redis; el historial viejo se limpia solo
+TASK_TTL = int(os.getenv("TASK_TTL", 24 * 3600))
+
+
+class MemoryTaskStore:
+    """Store por-proceso (solo válido con un worker)"""
+
+    def __init__(self):
+        from collections import OrderedDict
+        self._tasks = OrderedDict()
+        # Un Event propio por watcher: los clear() de un stream no roban wakeups a otro
+        self._watchers: dict = {}
+        self._running = 0
+
+    async def create(self, task_id: str, entry: dict):
+        self._tasks[task_id] = entry
+        for old_id in list(self._tasks):
+            if len(self._tasks) <= MAX_TASKS:
+                break
+            if self._tasks[old_id]["status"] in TERMINAL_STATUSES:
+                del self._tasks[old_id]
+
+    async def get(self, task_id: str):
+        return self._tasks.get(task_id)
+
+    async def set_status(self, task_id: str, status: str, result=None, error=None):
+        task = self._tasks.get(task_id)
+        if task is None:
+            return
+        previous = task["status"]
+        task["status"] = status
+        if result is not None:
+            task["result"] = result
+        if error is not None:
+            task["error"] = error
+        # Solo las transiciones reales mueven el contador: un "running" repetido
+        # no doble-incrementa y un terminal repetido no doble-decrementa
+        if status == "running" and previous != "running":
+            self._running += 1
+        elif status in TERMINAL_STATUSES and previous == "running":
+            self._running -= 1
+        for event in self._watchers.get(task_id, ()):
+            event.set()
+
+    async def list_ids(self, limit: int, offset: int):
+        count = len(self._tasks)
+        if limit <= 0 or offset < 0:
+            return [], count
+        task_ids = list(self._tasks.keys())
+        return task_ids[offset:offset + limit], count
+
+    async def running_count(self) -> int:
+        return self._running
+
+    async def watch(self, task_id: str):
+        """Generador de estados: emite el actual y uno por transición, termina en estado terminal"""
+        event = asyncio.Event()
+        watchers = self._watchers.setdefault(task_id, set())
+        watchers.add(event)
+        try:
+            while True:
+                task = self._tasks.get(task_id)
+                if task is None:
+                    return
+                yield dict(task)
+                if task["status"] in TERMINAL_STATUSES:
+                    return
+                await event.wait()
+                event.clear()
+        finally:
+            watchers.discard(event)
+            if not watchers:
+                self._watchers.pop(task_id, None)
+
+
+class RedisTaskStore:
+    """Store compartido entre workers vía Redis (hashes + pubsub + contador INCR)"""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        self._redis = redis.from_url(url, decode_responses=True)
+
+    def _key(self, task_id: str) -> str:
+        return f"task:{task_id}"
+
+    def _channel(self, task_id: str) -> str:
+        return f"task_change:{task_id}"
+
+    async def create(self, task_id: str, entry: dict):
+        await self._redis.hset(self._key(task_id), mapping={
+            "status": entry["status"],
+            "result": orjson.dumps(entry["result"]).decode(),
+            "error": entry["error"] or "",
+        })
+        await self._redis.expire(self._key(task_id), TASK_TTL)
+        await self._redis.lpush("tasks:ids", task_id)
+        await self._redis.ltrim("tasks:ids", 0, MAX_TASKS - 1)
+
+    async def get(self, task_id: str):
+        raw = await self._redis.hgetall(self._key(task_id))
+        if not raw:
+            return None
+        return {
+            "status": raw["status"],
+            "result": orjson.loads(raw["result"]) if raw.get("result") else None,
+            "error": raw["error"] or None,
+        }
+
+    async def set_status(self, task_id: str, status: str, result=None, error=None):
+        previous = await self._redis.hget(self._key(task_id), "status")
+        mapping = {"status": status}
+        if result is not None:
+            mapping["result"] = orjson.dumps(result).decode()
+        if error is not None:
+            mapping["error"] = error
+        await self._redis.hset(self._key(task_id), mapping=mapping)
+        # Solo transiciones reales mueven el contador (mismo criterio que en memoria)
+        if status == "running" and previous != "running":
+            await self._redis.incr("tasks:running")
+        elif status in TERMINAL_STATUSES and previous == "running":
+            await self._redis.decr("tasks:running")
+        await self._redis.publish(self._channel(task_id), status)
+
+    async def list_ids(self, limit: int, offset: int):
+        count = await self._redis.llen("tasks:ids")
+        # Mismos bordes que el store en memoria: con limit<=0 u offset negativo
+        # no hay rango válido (LRANGE 0 -1 devolvería la lista entera)
+        if limit <= 0 or offset < 0:
+            return [], count
+        task_ids = await self._redis.lrange("tasks:ids", offset, offset + limit - 1)
+        return task_ids, count
+
+    async def running_count(self) -> int:
+        count = await self._redis.get("tasks:running")
+        return int(count or 0)
+
+    async def watch(self, task_id: str):
+        """Generador de estados: emite el actual y uno por transición, termina en estado terminal
+
+        Se suscribe al canal ANTES de leer el estado y relee después de cada
+        mensaje, así un publish terminal no puede caer en el gap y colgar el
+        stream. Una sola conexión pubsub por watcher, no una por transición.
+        """
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(self._channel(task_id))
+        try:
+            while True:
+                task = await self.get(task_id)
+                if task is None:
+                    return
+                yield task
+                if task["status"] in TERMINAL_STATUSES:
+                    return
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        break
+        finally:
+            await pubsub.unsubscribe(self._channel(task_id))
+            await pubsub.aclose()
+
+
+def make_task_store():
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        return RedisTaskStore(redis_url)
+    return MemoryTaskStore()
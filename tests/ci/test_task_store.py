@@ -0,0 +1,155 @@
+"""
+Tests for the root-level task store (task_store.py) and the SSE event stream in server.py.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# task_store.py / server.py live at the repo root, next to pyproject.toml
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+import task_store
+from task_store import MemoryTaskStore
+
+
+@pytest.fixture
+def store():
+	return MemoryTaskStore()
+
+
+async def test_create_and_get_roundtrip(store):
+	await store.create('t1', {'status': 'pending', 'result': None, 'error': None})
+	task = await store.get('t1')
+	assert task == {'status': 'pending', 'result': None, 'error': None}
+	assert await store.get('missing') is None
+
+
+async def test_set_status_updates_fields(store):
+	await store.create('t1', {'status': 'pending', 'result': None, 'error': None})
+	await store.set_status('t1', 'completed', result={'success': True})
+	task = await store.get('t1')
+	assert task['status'] == 'completed'
+	assert task['result'] == {'success': True}
+
+	await store.create('t2', {'status': 'pending', 'result': None, 'error': None})
+	await store.set_status('t2', 'failed', error='boom')
+	task = await store.get('t2')
+	assert task['status'] == 'failed'
+	assert task['error'] == 'boom'
+
+
+async def test_running_count_moves_only_on_real_transitions(store):
+	await store.create('t1', {'status': 'pending', 'result': None, 'error': None})
+	await store.set_status('t1', 'running')
+	await store.set_status('t1', 'running')  # repeated "running" must not double-increment
+	assert await store.running_count() == 1
+	await store.set_status('t1', 'failed', error='boom')
+	assert await store.running_count() == 0
+	await store.set_status('t1', 'failed', error='boom')  # repeated terminal must not double-decrement
+	assert await store.running_count() == 0
+
+
+async def test_eviction_keeps_store_bounded(store, monkeypatch):
+	monkeypatch.setattr(task_store, 'MAX_TASKS', 3)
+	for i in range(3):
+		await store.create(f'done-{i}', {'status': 'completed', 'result': None, 'error': None})
+	await store.create('new', {'status': 'pending', 'result': None, 'error': None})
+
+	ids, count = await store.list_ids(limit=10, offset=0)
+	assert count == 3
+	assert 'new' in ids
+	assert 'done-0' not in ids  # oldest terminal entry was evicted
+
+
+async def test_eviction_never_drops_active_tasks(store, monkeypatch):
+	monkeypatch.setattr(task_store, 'MAX_TASKS', 2)
+	await store.create('r1', {'status': 'running', 'result': None, 'error': None})
+	await store.create('r2', {'status': 'running', 'result': None, 'error': None})
+	await store.create('r3', {'status': 'pending', 'result': None, 'error': None})
+
+	# nothing is terminal, so the bound is best-effort and nothing gets dropped
+	_, count = await store.list_ids(limit=10, offset=0)
+	assert count == 3
+
+
+async def test_list_ids_pagination(store):
+	for i in range(5):
+		await store.create(f't{i}', {'status': 'pending', 'result': None, 'error': None})
+	ids, count = await store.list_ids(limit=2, offset=1)
+	assert count == 5
+	assert len(ids) == 2
+
+	# invalid ranges return nothing instead of everything (LRANGE 0 -1 pitfall)
+	ids, count = await store.list_ids(limit=0, offset=0)
+	assert ids == []
+	assert count == 5
+	ids, _ = await store.list_ids(limit=2, offset=-1)
+	assert ids == []
+
+
+async def test_watch_yields_current_state_and_transitions(store):
+	await store.create('t1', {'status': 'pending', 'result': None, 'error': None})
+	seen = []
+
+	async def consume():
+		async for state in store.watch('t1'):
+			seen.append(state['status'])
+
+	consumer = asyncio.create_task(consume())
+	await asyncio.sleep(0.01)
+	await store.set_status('t1', 'running')
+	await asyncio.sleep(0.01)
+	await store.set_status('t1', 'completed', result={'success': True})
+	await asyncio.wait_for(consumer, timeout=1)
+
+	assert seen == ['pending', 'running', 'completed']
+	assert store._watchers == {}  # watcher events cleaned up on generator exit
+
+
+async def test_watch_terminates_immediately_on_terminal_task(store):
+	await store.create('t1', {'status': 'completed', 'result': None, 'error': None})
+	states = [state['status'] async for state in store.watch('t1')]
+	assert states == ['completed']
+
+
+async def test_concurrent_watchers_all_see_transitions(store):
+	await store.create('t1', {'status': 'pending', 'result': None, 'error': None})
+
+	async def consume():
+		return [state['status'] async for state in store.watch('t1')]
+
+	consumers = [asyncio.create_task(consume()) for _ in range(3)]
+	await asyncio.sleep(0.01)
+	await store.set_status('t1', 'running')
+	await asyncio.sleep(0.01)
+	await store.set_status('t1', 'completed')
+	results = await asyncio.wait_for(asyncio.gather(*consumers), timeout=1)
+
+	assert all(r == ['pending', 'running', 'completed'] for r in results)
+
+
+async def test_sse_event_stream_formats_events(monkeypatch):
+	import server
+
+	fresh = MemoryTaskStore()
+	monkeypatch.setattr(server, 'store', fresh)
+	await fresh.create('t1', {'status': 'pending', 'result': None, 'error': None})
+
+	events = []
+
+	async def consume():
+		async for chunk in server._task_event_stream('t1'):
+			events.append(chunk)
+
+	consumer = asyncio.create_task(consume())
+	await asyncio.sleep(0.01)
+	await fresh.set_status('t1', 'completed', result={'success': True})
+	await asyncio.wait_for(consumer, timeout=1)
+
+	assert len(events) == 2
+	assert all(e.startswith('data: ') and e.endswith('\n\n') for e in events)
+	assert '"pending"' in events[0]
+	assert '"completed"' in events[1]